@@ -17,8 +17,10 @@ from utils import (
     prepare_semantics,
     rerun_wren_engine,
     save_mdl_json_file,
+    serialize_chart_schema,
     show_asks_details_results,
     show_asks_results,
+    split_chart_data,
 )
 
 st.set_page_config(layout="wide")
@@ -256,9 +258,12 @@ if st.session_state["asks_results"]:
                     st.markdown("### Reasoning for making this chart")
                     st.markdown(f"{reasoning}")
                 if vega_lite_schema := chart_result["chart_schema"]:
+                    chart_spec, chart_data = split_chart_data(vega_lite_schema)
                     st.markdown("### Vega-Lite Schema")
-                    st.json(vega_lite_schema, expanded=False)
-                    st.vega_lite_chart(vega_lite_schema, use_container_width=True)
+                    st.json(serialize_chart_schema(chart_spec), expanded=False)
+                    st.vega_lite_chart(
+                        data=chart_data, spec=chart_spec, use_container_width=True
+                    )
 
                     st.button(
                         "Adjust Chart",
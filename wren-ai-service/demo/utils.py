@@ -1,37 +1,71 @@
-import base64
-import copy
-import json
+import functools
 import os
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, Optional, Tuple
 
 import orjson
 import pandas as pd
+import pyarrow as pa
+import pybase64
 import requests
 import sqlglot
-import sqlparse
 import sseclient
 import streamlit as st
 import yaml
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+try:
+    from yaml import CSafeDumper as _YamlDumper
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # pyyaml built without libyaml
+    from yaml import SafeDumper as _YamlDumper
+    from yaml import SafeLoader as _YamlLoader
 
 WREN_AI_SERVICE_BASE_URL = "http://localhost:5556"
 WREN_ENGINE_API_URL = "http://localhost:8080"
 WREN_IBIS_API_URL = "http://localhost:8000"
-POLLING_INTERVAL = 0.5
+POLLING_INTERVAL = 0.1
+MAX_POLLING_INTERVAL = 1.0
+STREAMING_FLUSH_INTERVAL = 0.05
 DATA_SOURCES = ["duckdb", "bigquery", "postgres"]
 
 load_dotenv()
 
+# share one keep-alive connection pool across all the api calls and polling loops
+_SESSION = requests.Session()
+_SESSION.mount(
+    "http://", HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=0)
+)
+# runs engine queries that don't depend on the ai service result alongside its polling
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+
+def _polling_intervals():
+    """Yield exponentially growing sleep intervals for the status polling loops."""
+    interval = POLLING_INTERVAL
+    while True:
+        yield interval
+        interval = min(interval * 2, MAX_POLLING_INTERVAL)
+
+
+def _loads(response: requests.Response):
+    return orjson.loads(response.content)
+
 
 def with_requests(url, headers):
     """Get a streaming response for the given event feed using requests."""
-    return requests.get(url, stream=True, headers=headers)
+    return _SESSION.get(url, stream=True, headers=headers)
 
 
-def add_quotes(sql: str) -> Tuple[str, bool]:
+@functools.lru_cache(maxsize=1024)
+def _transpile_identify(sql: str) -> Tuple[str, bool]:
     try:
         quoted_sql = sqlglot.transpile(sql, read="trino", identify=True)[0]
         return quoted_sql, True
@@ -41,6 +75,13 @@ def add_quotes(sql: str) -> Tuple[str, bool]:
         return sql, False
 
 
+def add_quotes(sql: str) -> Tuple[str, bool]:
+    # the same sql flows through preview, chart and answer, so reuse the result
+    return _transpile_identify(sql)
+
+
+# env variables are loaded once at import, so the connection info never changes
+@functools.lru_cache(maxsize=4)
 def _get_connection_info(data_source: str):
     if data_source == "bigquery":
         return {
@@ -58,8 +99,38 @@ def _get_connection_info(data_source: str):
         }
 
 
+@functools.lru_cache(maxsize=4)
+def _get_encoded_connection_info(data_source: str) -> str:
+    return pybase64.b64encode_as_string(orjson.dumps(_get_connection_info(data_source)))
+
+
+# manifests are not mutated once deployed, so the encoded string is cached by
+# object identity; keeping the manifest referenced stops its id from being reused.
+# app.py assigns a fresh mdl_json on every rerun, so this only saves the repeated
+# encodes within one script run
+_ENCODED_MANIFESTS: Dict[int, Tuple[dict, str]] = {}
+_ENCODED_MANIFESTS_MAXSIZE = 8
+# the engine calls submitted to _EXECUTOR fill the cache from worker threads too
+_ENCODED_MANIFESTS_LOCK = threading.Lock()
+
+
+def _get_encoded_manifest(manifest: dict) -> str:
+    if cached := _ENCODED_MANIFESTS.get(id(manifest)):
+        cached_manifest, encoded_manifest = cached
+        if cached_manifest is manifest:
+            return encoded_manifest
+
+    encoded_manifest = pybase64.b64encode_as_string(orjson.dumps(manifest))
+    with _ENCODED_MANIFESTS_LOCK:
+        if len(_ENCODED_MANIFESTS) >= _ENCODED_MANIFESTS_MAXSIZE:
+            _ENCODED_MANIFESTS.pop(next(iter(_ENCODED_MANIFESTS)))
+        _ENCODED_MANIFESTS[id(manifest)] = (manifest, encoded_manifest)
+
+    return encoded_manifest
+
+
 def _update_wren_engine_configs(configs: list[dict]):
-    response = requests.patch(
+    response = _SESSION.patch(
         f"{WREN_ENGINE_API_URL}/v1/config",
         json=configs,
     )
@@ -71,7 +142,7 @@ def rerun_wren_engine(mdl_json: Dict, dataset_type: str, dataset: Optional[str]
     assert dataset_type in DATA_SOURCES
 
     SOURCE = dataset_type
-    MANIFEST = base64.b64encode(orjson.dumps(mdl_json)).decode()
+    MANIFEST = _get_encoded_manifest(mdl_json)
     if dataset_type == "duckdb":
         _update_wren_engine_configs(
             [
@@ -83,13 +154,13 @@ def rerun_wren_engine(mdl_json: Dict, dataset_type: str, dataset: Optional[str]
         )
 
         _prepare_duckdb(dataset)
-        _replace_wren_engine_env_variables("wren_engine", {"manifest": MANIFEST})
+        config_changed = _replace_wren_engine_env_variables(
+            "wren_engine", {"manifest": MANIFEST}
+        )
     else:
-        WREN_IBIS_CONNECTION_INFO = base64.b64encode(
-            orjson.dumps(_get_connection_info(dataset_type))
-        ).decode()
+        WREN_IBIS_CONNECTION_INFO = _get_encoded_connection_info(dataset_type)
 
-        _replace_wren_engine_env_variables(
+        config_changed = _replace_wren_engine_env_variables(
             "wren_ibis",
             {
                 "manifest": MANIFEST,
@@ -100,27 +171,49 @@ def rerun_wren_engine(mdl_json: Dict, dataset_type: str, dataset: Optional[str]
             },
         )
 
-    # wait for wren-ai-service to restart
-    time.sleep(5)
+    # wait for wren-ai-service to restart, it only does so if config.yaml changed
+    if config_changed:
+        time.sleep(5)
 
 
 def save_mdl_json_file(file_name: str, mdl_json: Dict):
     if not Path("demo/custom_dataset").exists():
         Path("demo/custom_dataset").mkdir()
 
-    with open(f"demo/custom_dataset/{file_name}", "w", encoding="utf-8") as file:
-        json.dump(mdl_json, file, indent=2)
+    Path(f"demo/custom_dataset/{file_name}").write_bytes(
+        orjson.dumps(mdl_json, option=orjson.OPT_INDENT_2)
+    )
 
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_mdl_json(database_name: str):
     assert database_name in ["ecommerce", "hr"]
 
-    with open(f"demo/sample_dataset/{database_name}_duckdb_mdl.json", "r") as f:
-        mdl_json = json.load(f)
+    return orjson.loads(
+        Path(f"demo/sample_dataset/{database_name}_duckdb_mdl.json").read_bytes()
+    )
+
+
+def _to_dataframe(rows: list[list], column_names: list[str]) -> pd.DataFrame:
+    # build the frame column by column through arrow, falling back to pandas for
+    # empty results, columns arrow can't infer a single type for, ints beyond int64
+    # (e.g. UBIGINT) and nested values, which arrow would turn into numpy arrays
+    if rows:
+        try:
+            arrays = [pa.array(column) for column in zip(*rows)]
+            if not any(pa.types.is_nested(array.type) for array in arrays):
+                return pa.Table.from_arrays(arrays, names=column_names).to_pandas()
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            pass
+
+    return pd.DataFrame(rows, columns=column_names)
 
-    return mdl_json
 
+def _hash_dict(obj: dict) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
 
+
+@st.cache_data(ttl=60, show_spinner=False, hash_funcs={dict: _hash_dict})
 def get_data_from_wren_engine(
     sql: str,
     dataset_type: str,
@@ -132,7 +225,7 @@ def get_data_from_wren_engine(
         quoted_sql, no_error = add_quotes(sql)
         assert no_error, f"Error in adding quotes to SQL: {sql}"
 
-        response = requests.get(
+        response = _SESSION.get(
             f"{WREN_ENGINE_API_URL}/v1/mdl/preview",
             json={
                 "sql": quoted_sql,
@@ -143,22 +236,22 @@ def get_data_from_wren_engine(
 
         assert response.status_code == 200, response.text
 
-        data = response.json()
+        data = _loads(response)
 
         if return_df:
             column_names = [col["name"] for col in data["columns"]]
 
-            return pd.DataFrame(data["data"], columns=column_names)
+            return _to_dataframe(data["data"], column_names)
         else:
             return data
     else:
         quoted_sql, no_error = add_quotes(sql)
         assert no_error, f"Error in adding quotes to SQL: {sql}"
-        response = requests.post(
+        response = _SESSION.post(
             f"{WREN_IBIS_API_URL}/v2/connector/{dataset_type}/query?limit={limit}",
             json={
                 "sql": quoted_sql,
-                "manifestStr": base64.b64encode(orjson.dumps(manifest)).decode(),
+                "manifestStr": _get_encoded_manifest(manifest),
                 "connectionInfo": _get_connection_info(dataset_type),
                 "limit": limit,
             },
@@ -166,17 +259,25 @@ def get_data_from_wren_engine(
 
         assert response.status_code == 200, response.text
 
-        data = response.json()
+        data = _loads(response)
 
         if return_df:
             column_names = [col for col in data["columns"]]
 
-            return pd.DataFrame(data["data"], columns=column_names)
+            return _to_dataframe(data["data"], column_names)
         else:
             return data
 
 
 # ui related
+@st.cache_data(show_spinner=False)
+def _format_sql(sql: str) -> str:
+    # sqlparse is only needed once a SQL panel is shown, so import it on first use
+    import sqlparse
+
+    return sqlparse.format(sql, reindent=True, keyword_case="upper")
+
+
 def on_change_sql_generation_reasoning():
     st.session_state["sql_generation_reasoning"] = st.session_state[
         "sql_generation_reasoning_input"
@@ -204,20 +305,14 @@ def show_query_history():
     if st.session_state["query_history"]:
         with st.expander("Query History", expanded=False):
             st.code(
-                body=sqlparse.format(
-                    st.session_state["query_history"]["sql"],
-                    reindent=True,
-                    keyword_case="upper",
-                ),
+                body=_format_sql(st.session_state["query_history"]["sql"]),
                 language="sql",
             )
             for i, step in enumerate(st.session_state["query_history"]["steps"]):
                 st.markdown(f"#### Step {i + 1}")
                 st.markdown(step["summary"])
                 st.code(
-                    body=sqlparse.format(
-                        step["sql"], reindent=True, keyword_case="upper"
-                    ),
+                    body=_format_sql(step["sql"]),
                     language="sql",
                 )
 
@@ -261,11 +356,7 @@ def show_asks_results():
         st.markdown("### SQL Query Result")
         edited_sql = st.text_area(
             label="SQL Query Result",
-            value=sqlparse.format(
-                st.session_state["asks_results"]["response"][0]["sql"],
-                reindent=True,
-                keyword_case="upper",
-            ),
+            value=_format_sql(st.session_state["asks_results"]["response"][0]["sql"]),
             height=250,
             label_visibility="hidden",
         )
@@ -295,25 +386,20 @@ def show_asks_details_results():
         f'Description: {st.session_state['asks_details_result']["description"]}'
     )
 
-    sqls_with_cte = []
-    sqls = []
-    summaries = []
+    # previous steps are kept as one growing CTE list instead of re-joining them
+    ctes = ""
     for i, step in enumerate(st.session_state["asks_details_result"]["steps"]):
         st.markdown(f"#### Step {i + 1}")
         st.markdown(f'Summary: {step["summary"]}')
 
-        sql = ""
-        if sqls_with_cte:
-            sql += "WITH " + ",\n".join(sqls_with_cte) + "\n\n"
-        sql += step["sql"]
-        sqls.append(sql)
-        summaries.append(step["summary"])
+        sql = f"WITH {ctes}\n\n{step['sql']}" if ctes else step["sql"]
 
         st.code(
-            body=sqlparse.format(sql, reindent=True, keyword_case="upper"),
+            body=_format_sql(sql),
             language="sql",
         )
-        sqls_with_cte.append(f"{step['cte_name']} AS ( {step['sql']} )")
+        cte = f"{step['cte_name']} AS ( {step['sql']} )"
+        ctes = f"{ctes},\n{cte}" if ctes else cte
 
 
 def on_click_adjust_chart(
@@ -347,7 +433,7 @@ def generate_mdl_metadata(mdl_model_json: dict):
         identifiers.append(f'column_name@{column['name']}')
 
     st.toast(f'Generating MDL metadata for model {mdl_model_json['name']}', icon="⏳")
-    generate_mdl_metadata_response = requests.post(
+    generate_mdl_metadata_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/semantics-descriptions",
         json={
             "mdl": mdl_model_json,
@@ -358,7 +444,7 @@ def generate_mdl_metadata(mdl_model_json: dict):
 
     assert generate_mdl_metadata_response.status_code == 200
 
-    for response in generate_mdl_metadata_response.json():
+    for response in _loads(generate_mdl_metadata_response):
         if response["identifier"] == mdl_model_json["name"]:
             mdl_model_json["properties"]["description"] = response["description"]
             mdl_model_json["properties"]["display_name"] = response["display_name"]
@@ -375,10 +461,8 @@ def generate_mdl_metadata(mdl_model_json: dict):
     return mdl_model_json
 
 
-def _prepare_duckdb(dataset_name: str):
-    assert dataset_name in ["ecommerce", "hr"]
-
-    init_sqls = {
+_DUCKDB_INIT_SQLS = MappingProxyType(
+    {
         "ecommerce": """
 CREATE TABLE olist_customers_dataset AS FROM read_parquet('https://assets.getwren.ai/sample_data/brazilian-ecommerce/olist_customers_dataset.parquet');
 CREATE TABLE olist_order_items_dataset AS FROM read_parquet('https://assets.getwren.ai/sample_data/brazilian-ecommerce/olist_order_items_dataset.parquet');
@@ -399,23 +483,34 @@ CREATE TABLE employees AS FROM read_parquet('https://assets.getwren.ai/sample_da
 CREATE TABLE dept_manager AS FROM read_parquet('https://assets.getwren.ai/sample_data/employees/dept_manager.parquet');
 """,
     }
+)
+
+
+def _prepare_duckdb(dataset_name: str):
+    assert dataset_name in ["ecommerce", "hr"]
 
     with open("./tools/dev/etc/duckdb-init.sql", "w") as f:
         f.write("")
 
-    response = requests.put(
+    response = _SESSION.put(
         f"{WREN_ENGINE_API_URL}/v1/data-source/duckdb/settings/init-sql",
-        data=init_sqls[dataset_name],
+        data=_DUCKDB_INIT_SQLS[dataset_name],
     )
 
     assert response.status_code == 200, response.text
 
 
-def _replace_wren_engine_env_variables(engine_type: str, data: dict):
+def _config_snapshot(configs: list[dict]) -> bytes:
+    return orjson.dumps(configs, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+
+def _replace_wren_engine_env_variables(engine_type: str, data: dict) -> bool:
+    """Point config.yaml at the given engine, returning whether the file changed."""
     assert engine_type in ("wren_engine", "wren_ibis")
 
     with open("config.yaml", "r") as f:
-        configs = list(yaml.safe_load_all(f))
+        configs = list(yaml.load_all(f, Loader=_YamlLoader))
+        original_snapshot = _config_snapshot(configs)
 
         for config in configs:
             if config.get("type") == "engine" and config.get("provider") == engine_type:
@@ -426,12 +521,17 @@ def _replace_wren_engine_env_variables(engine_type: str, data: dict):
                     if "engine" in pipe:
                         config["pipes"][i]["engine"] = engine_type
 
+    if _config_snapshot(configs) == original_snapshot:
+        return False
+
     with open("config.yaml", "w") as f:
-        yaml.safe_dump_all(configs, f, default_flow_style=False)
+        yaml.dump_all(configs, f, Dumper=_YamlDumper, default_flow_style=False)
+
+    return True
 
 
 def prepare_semantics(mdl_json: dict):
-    semantics_preparation_response = requests.post(
+    semantics_preparation_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/semantics-preparations",
         json={
             "mdl": orjson.dumps(mdl_json).decode("utf-8"),
@@ -441,20 +541,23 @@ def prepare_semantics(mdl_json: dict):
 
     assert semantics_preparation_response.status_code == 200
     assert (
-        semantics_preparation_response.json()["id"] == st.session_state["deployment_id"]
+        _loads(semantics_preparation_response)["id"]
+        == st.session_state["deployment_id"]
     )
 
+    polling_intervals = _polling_intervals()
+
     while (
         not st.session_state["semantics_preparation_status"]
         or st.session_state["semantics_preparation_status"] == "indexing"
     ):
-        semantics_preparation_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        semantics_preparation_status_response = _SESSION.get(
             f'{WREN_AI_SERVICE_BASE_URL}/v1/semantics-preparations/{st.session_state['deployment_id']}/status'
         )
-        st.session_state[
-            "semantics_preparation_status"
-        ] = semantics_preparation_status_response.json()["status"]
-        time.sleep(POLLING_INTERVAL)
+        st.session_state["semantics_preparation_status"] = _loads(
+            semantics_preparation_status_response
+        )["status"]
 
     # reset relevant session_states
     st.session_state["query"] = None
@@ -475,7 +578,7 @@ def prepare_semantics(mdl_json: dict):
 
 def ask(query: str, timezone: str, query_history: Optional[dict] = None):
     st.session_state["query"] = query
-    asks_response = requests.post(
+    asks_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/asks",
         json={
             "query": query,
@@ -492,29 +595,31 @@ def ask(query: str, timezone: str, query_history: Optional[dict] = None):
     )
 
     assert asks_response.status_code == 200
-    query_id = asks_response.json()["query_id"]
+    query_id = _loads(asks_response)["query_id"]
     asks_status = None
+    polling_intervals = _polling_intervals()
 
     while not asks_status or (
         asks_status != "finished"
         and asks_status != "failed"
         and asks_status != "stopped"
     ):
-        asks_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        asks_status_response = _SESSION.get(
             f"{WREN_AI_SERVICE_BASE_URL}/v1/asks/{query_id}/result"
         )
         assert asks_status_response.status_code == 200
-        asks_status = asks_status_response.json()["status"]
-        asks_type = asks_status_response.json()["type"]
+        asks_result = _loads(asks_status_response)
+        asks_status = asks_result["status"]
+        asks_type = asks_result["type"]
         st.toast(f"The query processing status: {asks_status}")
-        time.sleep(POLLING_INTERVAL)
 
     if asks_status == "finished":
         st.session_state["asks_results_type"] = asks_type
         if asks_type == "GENERAL":
             display_streaming_response(query_id)
         elif asks_type == "TEXT_TO_SQL":
-            st.session_state["asks_results"] = asks_status_response.json()
+            st.session_state["asks_results"] = asks_result
             st.session_state["sql_generation_reasoning"] = st.session_state[
                 "asks_results"
             ]["sql_generation_reasoning"]
@@ -525,13 +630,13 @@ def ask(query: str, timezone: str, query_history: Optional[dict] = None):
             st.session_state["asks_results"] = asks_type
     elif asks_status == "failed":
         st.error(
-            f'An error occurred while processing the query: {asks_status_response.json()['error']}',
+            f'An error occurred while processing the query: {asks_result['error']}',
             icon="🚨",
         )
 
 
 def ask_feedback(tables: list[str], sql_generation_reasoning: str, sql: str):
-    ask_feedback_response = requests.post(
+    ask_feedback_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/ask-feedbacks",
         json={
             "tables": tables,
@@ -544,39 +649,41 @@ def ask_feedback(tables: list[str], sql_generation_reasoning: str, sql: str):
     )
 
     assert ask_feedback_response.status_code == 200
-    query_id = ask_feedback_response.json()["query_id"]
+    query_id = _loads(ask_feedback_response)["query_id"]
     ask_feedback_status = None
+    polling_intervals = _polling_intervals()
 
     while not ask_feedback_status or (
         ask_feedback_status != "finished"
         and ask_feedback_status != "failed"
         and ask_feedback_status != "stopped"
     ):
-        ask_feedback_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        ask_feedback_status_response = _SESSION.get(
             f"{WREN_AI_SERVICE_BASE_URL}/v1/ask-feedbacks/{query_id}"
         )
         assert ask_feedback_status_response.status_code == 200
-        ask_feedback_status = ask_feedback_status_response.json()["status"]
+        ask_feedback_result = _loads(ask_feedback_status_response)
+        ask_feedback_status = ask_feedback_result["status"]
         st.toast(f"The query processing status: {ask_feedback_status}")
-        time.sleep(POLLING_INTERVAL)
 
     if ask_feedback_status == "finished":
         st.session_state["asks_results_type"] = "TEXT_TO_SQL"
-        st.session_state["asks_results"] = ask_feedback_status_response.json()
+        st.session_state["asks_results"] = ask_feedback_result
     elif ask_feedback_status == "failed":
         st.error(
-            f'An error occurred while processing the query: {ask_feedback_status_response.json()['error']}',
+            f'An error occurred while processing the query: {ask_feedback_result['error']}',
             icon="🚨",
         )
 
 
 def save_sql_pair(question: str, sql: str):
-    save_sql_pair_response = requests.post(
+    save_sql_pair_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/sql-pairs",
         json={
             "sql_pairs": [
                 {
-                    "id": str(uuid.uuid4()),
+                    "id": uuid.uuid4().hex,
                     "question": question,
                     "sql": sql,
                 }
@@ -585,55 +692,61 @@ def save_sql_pair(question: str, sql: str):
     )
 
     assert save_sql_pair_response.status_code == 200
-    query_id = save_sql_pair_response.json()["id"]
+    query_id = _loads(save_sql_pair_response)["id"]
     save_sql_pair_status = None
+    polling_intervals = _polling_intervals()
 
     while not save_sql_pair_status or (
         save_sql_pair_status != "finished" and save_sql_pair_status != "failed"
     ):
-        save_sql_pair_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        save_sql_pair_status_response = _SESSION.get(
             f"{WREN_AI_SERVICE_BASE_URL}/v1/sql-pairs/{query_id}"
         )
         assert save_sql_pair_status_response.status_code == 200
-        save_sql_pair_status = save_sql_pair_status_response.json()["status"]
+        save_sql_pair_result = _loads(save_sql_pair_status_response)
+        save_sql_pair_status = save_sql_pair_result["status"]
         st.toast(f"The sql pair processing status: {save_sql_pair_status}")
-        time.sleep(POLLING_INTERVAL)
 
     if save_sql_pair_status == "finished":
         st.toast("The sql pair is saved successfully", icon="🎉")
     elif save_sql_pair_status == "failed":
         st.error(
-            f'An error occurred while processing the sql pair: {save_sql_pair_status_response.json()['error']}',
+            f'An error occurred while processing the sql pair: {save_sql_pair_result['error']}',
             icon="🚨",
         )
 
 
-def display_streaming_response(query_id: str):
-    url = f"{WREN_AI_SERVICE_BASE_URL}/v1/asks/{query_id}/streaming-result"
+def _display_streaming_markdown(url: str):
     headers = {"Accept": "text/event-stream"}
     response = with_requests(url, headers)
     client = sseclient.SSEClient(response)
 
-    markdown_content = ""
+    # buffer the streamed messages and repaint at most every STREAMING_FLUSH_INTERVAL
+    messages = []
     placeholder = st.empty()
+    last_flushed_at = 0.0
 
     for event in client.events():
-        markdown_content += orjson.loads(event.data)["message"]
-        placeholder.markdown(markdown_content)
+        messages.append(orjson.loads(event.data)["message"])
+        now = time.monotonic()
+        if now - last_flushed_at > STREAMING_FLUSH_INTERVAL:
+            placeholder.markdown("".join(messages))
+            last_flushed_at = now
 
+    placeholder.markdown("".join(messages))
 
-def display_sql_answer(query_id: str):
-    url = f"{WREN_AI_SERVICE_BASE_URL}/v1/sql-answers/{query_id}/streaming"
-    headers = {"Accept": "text/event-stream"}
-    response = with_requests(url, headers)
-    client = sseclient.SSEClient(response)
 
-    markdown_content = ""
-    placeholder = st.empty()
+def display_streaming_response(query_id: str):
+    _display_streaming_markdown(
+        f"{WREN_AI_SERVICE_BASE_URL}/v1/asks/{query_id}/streaming-result"
+    )
 
-    for event in client.events():
-        markdown_content += orjson.loads(event.data)["message"]
-        placeholder.markdown(markdown_content)
+
+def display_sql_answer(query_id: str):
+    _display_streaming_markdown(
+        f"{WREN_AI_SERVICE_BASE_URL}/v1/sql-answers/{query_id}/streaming"
+    )
 
 
 def get_sql_answer(
@@ -649,7 +762,7 @@ def get_sql_answer(
         return_df=False,
     )
 
-    sql_answer_response = requests.post(
+    sql_answer_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/sql-answers",
         json={
             "query": query,
@@ -662,30 +775,32 @@ def get_sql_answer(
     )
 
     assert sql_answer_response.status_code == 200
-    query_id = sql_answer_response.json()["query_id"]
+    query_id = _loads(sql_answer_response)["query_id"]
     sql_answer_status = None
+    polling_intervals = _polling_intervals()
 
     while not sql_answer_status or (
         sql_answer_status != "succeeded" and sql_answer_status != "failed"
     ):
-        sql_answer_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        sql_answer_status_response = _SESSION.get(
             f"{WREN_AI_SERVICE_BASE_URL}/v1/sql-answers/{query_id}"
         )
         assert sql_answer_status_response.status_code == 200
-        sql_answer_status = sql_answer_status_response.json()["status"]
-        time.sleep(POLLING_INTERVAL)
+        sql_answer_result = _loads(sql_answer_status_response)
+        sql_answer_status = sql_answer_result["status"]
 
     if sql_answer_status == "succeeded":
         display_sql_answer(query_id)
     elif sql_answer_status == "failed":
         st.error(
-            f'An error occurred while processing the query: {sql_answer_status_response.json()['error']}',
+            f'An error occurred while processing the query: {sql_answer_result['error']}',
             icon="🚨",
         )
 
 
 def ask_details():
-    asks_details_response = requests.post(
+    asks_details_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/ask-details",
         json={
             "query": st.session_state["chosen_query_result"]["query"],
@@ -697,20 +812,22 @@ def ask_details():
     )
 
     assert asks_details_response.status_code == 200
-    query_id = asks_details_response.json()["query_id"]
+    query_id = _loads(asks_details_response)["query_id"]
     asks_details_status = None
+    polling_intervals = _polling_intervals()
 
     while (
         asks_details_status != "finished" and asks_details_status != "failed"
     ) or not asks_details_status:
-        asks_details_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        asks_details_status_response = _SESSION.get(
             f"{WREN_AI_SERVICE_BASE_URL}/v1/ask-details/{query_id}/result"
         )
         assert asks_details_status_response.status_code == 200
-        asks_details_status = asks_details_status_response.json()["status"]
-        time.sleep(POLLING_INTERVAL)
+        asks_details_result = _loads(asks_details_status_response)
+        asks_details_status = asks_details_result["status"]
 
-    return asks_details_status_response.json()
+    return asks_details_result
 
 
 def fill_vega_lite_values(vega_lite_schema: dict, df: pd.DataFrame) -> dict:
@@ -723,8 +840,8 @@ def fill_vega_lite_values(vega_lite_schema: dict, df: pd.DataFrame) -> dict:
     Returns:
         Updated Vega-Lite schema with values from DataFrame
     """
-    # Create a copy to avoid modifying original
-    schema = copy.deepcopy(vega_lite_schema)
+    # Only "data" is modified below, so copy that level instead of the whole schema
+    schema = {**vega_lite_schema, "data": {**vega_lite_schema.get("data", {})}}
 
     # Get field names from encoding
     fields = []
@@ -740,8 +857,14 @@ def fill_vega_lite_values(vega_lite_schema: dict, df: pd.DataFrame) -> dict:
                 except ValueError:
                     pass
 
-    # Convert DataFrame to list of dicts with just the needed fields
-    values = df[fields].to_dict(orient="records")
+    # Joins can return duplicated column names (e.g. a.id, b.id); keep the last
+    # one per name like to_dict(orient="records") did, so df[field] is a Series
+    if df.columns.has_duplicates:
+        df = df.loc[:, ~df.columns.duplicated(keep="last")]
+
+    # Convert DataFrame to list of dicts with just the needed fields, column by column
+    columns = {field: df[field].tolist() for field in fields}
+    values = [dict(zip(columns, row)) for row in zip(*columns.values())]
 
     # Update schema values
     schema["data"]["values"] = values
@@ -757,7 +880,7 @@ def generate_chart(
     manifest: dict,
     limit: int = 100,
 ):
-    chart_response = requests.post(
+    chart_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/charts",
         json={
             "query": query,
@@ -769,28 +892,31 @@ def generate_chart(
     )
 
     assert chart_response.status_code == 200
-    query_id = chart_response.json()["query_id"]
+    query_id = _loads(chart_response)["query_id"]
+    sql_data_future = _EXECUTOR.submit(
+        get_data_from_wren_engine,
+        sql,
+        dataset_type,
+        manifest,
+        limit,
+    )
     charts_status = None
+    polling_intervals = _polling_intervals()
 
     while not charts_status or (
         charts_status != "finished"
         and charts_status != "failed"
         and charts_status != "stopped"
     ):
-        charts_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        charts_status_response = _SESSION.get(
             f"{WREN_AI_SERVICE_BASE_URL}/v1/charts/{query_id}"
         )
         assert charts_status_response.status_code == 200
-        charts_status = charts_status_response.json()["status"]
-        time.sleep(POLLING_INTERVAL)
+        chart_response = _loads(charts_status_response)
+        charts_status = chart_response["status"]
 
-    sql_data_df = get_data_from_wren_engine(
-        sql,
-        dataset_type,
-        manifest,
-        limit,
-    )
-    chart_response = charts_status_response.json()
+    sql_data_df = sql_data_future.result()
     if chart_result := chart_response.get("response"):
         if schema := chart_result.get("chart_schema"):
             filled_vega_lite_schema = fill_vega_lite_values(schema, sql_data_df)
@@ -810,7 +936,7 @@ def adjust_chart(
     limit: int = 100,
 ):
     chart_schema["data"]["values"] = []
-    adjust_chart_response = requests.post(
+    adjust_chart_response = _SESSION.post(
         f"{WREN_AI_SERVICE_BASE_URL}/v1/chart-adjustments",
         json={
             "query": query,
@@ -824,28 +950,31 @@ def adjust_chart(
     )
 
     assert adjust_chart_response.status_code == 200
-    query_id = adjust_chart_response.json()["query_id"]
+    query_id = _loads(adjust_chart_response)["query_id"]
+    sql_data_future = _EXECUTOR.submit(
+        get_data_from_wren_engine,
+        sql,
+        dataset_type,
+        manifest,
+        limit,
+    )
     charts_status = None
+    polling_intervals = _polling_intervals()
 
     while not charts_status or (
         charts_status != "finished"
         and charts_status != "failed"
         and charts_status != "stopped"
     ):
-        charts_status_response = requests.get(
+        time.sleep(next(polling_intervals))
+        charts_status_response = _SESSION.get(
             f"{WREN_AI_SERVICE_BASE_URL}/v1/chart-adjustments/{query_id}"
         )
         assert charts_status_response.status_code == 200
-        charts_status = charts_status_response.json()["status"]
-        time.sleep(POLLING_INTERVAL)
+        chart_response = _loads(charts_status_response)
+        charts_status = chart_response["status"]
 
-    sql_data_df = get_data_from_wren_engine(
-        sql,
-        dataset_type,
-        manifest,
-        limit,
-    )
-    chart_response = charts_status_response.json()
+    sql_data_df = sql_data_future.result()
     if chart_result := chart_response.get("response"):
         if schema := chart_result.get("chart_schema"):
             filled_vega_lite_schema = fill_vega_lite_values(schema, sql_data_df)
@@ -854,15 +983,117 @@ def adjust_chart(
     return chart_response
 
 
+@dataclass(slots=True, frozen=True)
+class AdjustmentOption:
+    chart_type: str
+    x_axis: Optional[str] = None
+    y_axis: Optional[str] = None
+    color: Optional[str] = None
+    x_offset: Optional[str] = None
+    theta: Optional[str] = None
+
+
+class _UncachedAdjustChartResponse(Exception):
+    """Carries a failed or stopped adjustment out of _cached_adjust_chart.
+
+    st.cache_data doesn't store results that raise, so a retry sends a new request.
+    """
+
+    def __init__(self, response: dict):
+        super().__init__(response.get("error"))
+        self.response = response
+
+
+# the chart schema is generated from the same query and sql, so it is left out of
+# the cache key by its leading underscore; every entry holds a filled chart schema
+# and the cache is shared by all sessions, so it is bounded
+@st.cache_data(
+    ttl=3600, max_entries=32, show_spinner=False, hash_funcs={dict: _hash_dict}
+)
+def _cached_adjust_chart(
+    query: str,
+    sql: str,
+    _chart_schema: dict,
+    adjustment_option: AdjustmentOption,
+    language: str,
+    dataset_type: str,
+    manifest: dict,
+    limit: int = 100,
+):
+    adjust_chart_response = adjust_chart(
+        query,
+        sql,
+        _chart_schema,
+        asdict(adjustment_option),
+        language,
+        dataset_type,
+        manifest,
+        limit,
+    )
+    if adjust_chart_response["status"] != "finished":
+        raise _UncachedAdjustChartResponse(adjust_chart_response)
+
+    return adjust_chart_response
+
+
+def split_chart_data(chart_schema: dict) -> Tuple[dict, Optional[pd.DataFrame]]:
+    """Take inline data.values out of a Vega-Lite schema as a DataFrame.
+
+    The DataFrame is then given to st.vega_lite_chart as its data argument, so the
+    rows are sent to the frontend once as columnar Arrow instead of row-wise JSON
+    repeated in the schema view as well.
+    """
+    data = chart_schema.get("data")
+    if not isinstance(data, dict) or "values" not in data:
+        return chart_schema, None
+
+    schema = {key: value for key, value in chart_schema.items() if key != "data"}
+    return schema, pd.DataFrame(data["values"])
+
+
+def serialize_chart_schema(chart_schema: dict) -> str:
+    # st.json passes strings through as-is, so serialize with orjson up front
+    # instead of letting streamlit json.dumps the whole spec on every rerun
+    return orjson.dumps(
+        chart_schema, default=str, option=orjson.OPT_SERIALIZE_NUMPY
+    ).decode("utf-8")
+
+
 def show_original_chart(chart_schema: dict, reasoning: str, chart_type: str):
-    st.markdown("### Original")
-    st.markdown(f"#### Chart Type: {chart_type}")
-    st.markdown("#### Reasoning for making this chart")
-    st.markdown(f"{reasoning}")
-    st.markdown("#### Vega-Lite Schema")
-    st.json(chart_schema, expanded=False)
+    st.markdown(
+        f"### Original\n\n#### Chart Type: {chart_type}\n\n"
+        f"#### Reasoning for making this chart\n\n{reasoning}\n\n"
+        "#### Vega-Lite Schema"
+    )
+    chart_schema, chart_data = split_chart_data(chart_schema)
+    st.json(serialize_chart_schema(chart_schema), expanded=False)
     st.markdown("#### Chart Description")
-    st.vega_lite_chart(chart_schema, use_container_width=True)
+    st.vega_lite_chart(data=chart_data, spec=chart_schema, use_container_width=True)
+
+
+# the text inputs shown for each chart type, as (adjustment option key, label)
+_CHART_ADJUSTMENT_FIELDS = MappingProxyType(
+    {
+        "bar": (("x_axis", "X Axis Field"), ("y_axis", "Y Axis Field")),
+        "grouped_bar": (
+            ("x_axis", "X Axis Field"),
+            ("y_axis", "Y Axis Field"),
+            ("x_offset", "X Offset Field"),
+        ),
+        "line": (
+            ("x_axis", "X Axis Field"),
+            ("y_axis", "Y Axis Field"),
+            ("color", "Line Groups"),
+        ),
+        "pie": (("theta", "Value"), ("color", "Category")),
+        "stacked_bar": (
+            ("x_axis", "X Axis Field"),
+            ("y_axis", "Y Axis Field"),
+            ("color", "Stack Groups"),
+        ),
+        "area": (("x_axis", "X Axis Field"), ("y_axis", "Y Axis Field")),
+    }
+)
 
 
 @st.dialog("Adjust Chart", width="large")
@@ -877,75 +1108,69 @@ def show_chart_adjustment_dialog(
     manifest: dict,
     limit: int = 100,
 ):
-    adjustment_chart_type = st.selectbox(
-        "Chart Type", ["bar", "grouped_bar", "line", "pie", "stacked_bar", "area"]
-    )
-    x_axis = y_axis = color = x_offset = theta = None
-    if adjustment_chart_type == "bar":
-        x_axis = st.text_input("X Axis Field")
-        y_axis = st.text_input("Y Axis Field")
-    elif adjustment_chart_type == "grouped_bar":
-        x_axis = st.text_input("X Axis Field")
-        y_axis = st.text_input("Y Axis Field")
-        x_offset = st.text_input("X Offset Field")
-    elif adjustment_chart_type == "stacked_bar":
-        x_axis = st.text_input("X Axis Field")
-        y_axis = st.text_input("Y Axis Field")
-        color = st.text_input("Stack Groups")
-    elif adjustment_chart_type == "line":
-        x_axis = st.text_input("X Axis Field")
-        y_axis = st.text_input("Y Axis Field")
-        color = st.text_input("Line Groups")
-    elif adjustment_chart_type == "pie":
-        theta = st.text_input("Value")
-        color = st.text_input("Category")
-    elif adjustment_chart_type == "area":
-        x_axis = st.text_input("X Axis Field")
-        y_axis = st.text_input("Y Axis Field")
-
-    adjust_submit_button = st.button("Adjust")
+    adjustment_chart_type = st.selectbox("Chart Type", list(_CHART_ADJUSTMENT_FIELDS))
+    # batch the field inputs so typing in them does not rerun the dialog, and submit
+    # only on the button since every submit is an LLM round trip
+    with st.form("adjust_chart_form", enter_to_submit=False):
+        fields = {
+            key: st.text_input(label)
+            for key, label in _CHART_ADJUSTMENT_FIELDS[adjustment_chart_type]
+        }
+        adjust_submit_button = st.form_submit_button("Adjust")
 
-    st.markdown("### Question")
-    st.markdown(query)
-    st.markdown("### SQL")
+    st.markdown(f"### Question\n\n{query}\n\n### SQL")
     st.code(
-        body=sqlparse.format(
-            sql,
-            reindent=True,
-            keyword_case="upper",
-        ),
+        body=_format_sql(sql),
         language="sql",
     )
 
     show_original_chart(chart_schema, reasoning, chart_type)
 
     if adjust_submit_button:
-        adjustment_option = {
-            "chart_type": adjustment_chart_type,
-            "x_axis": x_axis,
-            "y_axis": y_axis,
-            "color": color,
-            "x_offset": x_offset,
-            "theta": theta,
-        }
-        adjust_chart_response = adjust_chart(
-            query,
-            sql,
-            chart_schema,
-            adjustment_option,
-            language,
-            dataset_type,
-            manifest,
-            limit,
-        )
+        # strip the typed field names so trivially different inputs share a cache entry
+        fields = {key: value.strip() for key, value in fields.items()}
+        # the same chart type with no field filled in would only ask the LLM to
+        # regenerate the original chart
+        if adjustment_chart_type == chart_type and not any(fields.values()):
+            st.toast(
+                "Choose another chart type or fill in a field to adjust the chart",
+                icon="⚠️",
+            )
+            return
+
+        try:
+            adjust_chart_response = _cached_adjust_chart(
+                query,
+                sql,
+                chart_schema,
+                AdjustmentOption(chart_type=adjustment_chart_type, **fields),
+                language,
+                dataset_type,
+                manifest,
+                limit,
+            )
+        except _UncachedAdjustChartResponse as e:
+            adjust_chart_response = e.response
+
         if adjust_chart_result := adjust_chart_response.get("response"):
-            st.markdown("### Adjusted")
+            # send the adjusted headings and reasoning as one markdown element
+            parts = ["### Adjusted"]
             if chart_type := adjust_chart_result["chart_type"]:
-                st.markdown(f"#### Chart Type: {chart_type}")
+                parts.append(f"#### Chart Type: {chart_type}")
             if reasoning := adjust_chart_result["reasoning"]:
-                st.markdown("#### Reasoning for making this chart")
-                st.markdown(f"{reasoning}")
-            if vega_lite_schema := adjust_chart_result["chart_schema"]:
-                st.markdown("#### Vega-Lite Schema")
-                st.json(vega_lite_schema, expanded=False)
-                st.vega_lite_chart(vega_lite_schema, use_container_width=True)
+                parts += ["#### Reasoning for making this chart", reasoning]
+            vega_lite_schema = adjust_chart_result["chart_schema"]
+            if vega_lite_schema:
+                parts.append("#### Vega-Lite Schema")
+            st.markdown("\n\n".join(parts))
+            if vega_lite_schema:
+                vega_lite_schema, chart_data = split_chart_data(vega_lite_schema)
+                st.json(serialize_chart_schema(vega_lite_schema), expanded=False)
+                st.vega_lite_chart(
+                    data=chart_data, spec=vega_lite_schema, use_container_width=True
+                )
+        else:
+            st.error(
+                f'An error occurred while processing the query: {adjust_chart_response.get("error")}',
+                icon="🚨",
+            )
@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+import sqlglot
+from pytest_mock import MockFixture
+
+from demo.utils import (
+    AdjustmentOption,
+    _cached_adjust_chart,
+    _to_dataframe,
+    _UncachedAdjustChartResponse,
+    add_quotes,
+    fill_vega_lite_values,
+)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        'SELECT "a", COUNT(*) FROM "t" GROUP BY "a" ORDER BY 2 DESC LIMIT 10',
+        'SELECT CAST("a" AS DATE) FROM "t" WHERE "b" IS NOT NULL',
+        """SELECT "a" FROM "t" WHERE "b" = 'x y' AND "c" LIKE 'A%'""",
+        'SELECT A FROM "t"',
+        'SELECT COUNT(*) AS TOTAL FROM "t"',
+        'SELECT "t".A FROM "t"',
+        'select "a" from "t"',
+        "SELECT a FROM t",
+        'SELECT "a" FROM "t" WHERE "d" > CURRENT_DATE - INTERVAL \'1\' DAY',
+        # identifiers named like keywords
+        'SELECT DATE FROM "t"',
+        'SELECT "t".KEY FROM "t"',
+        'SELECT "a" FROM "t" ORDER BY DATE',
+        'SELECT COMMENT, COUNT(*) FROM "t" GROUP BY COMMENT',
+        'SELECT COUNT(*) AS TABLE FROM "orders"',
+        'SELECT "a" AS FIRST, "b" AS FORMAT, "c" AS RANGE FROM "t"',
+        'SELECT "a" AS INDEX, "b" AS SCHEMA, "c" AS VIEW, "d" AS FILTER FROM "t"',
+        'SELECT "a" FROM "t" WHERE "b" = $1',
+    ],
+)
+def test_add_quotes_matches_sqlglot(sql: str):
+    assert add_quotes(sql) == (
+        sqlglot.transpile(sql, read="trino", identify=True)[0],
+        True,
+    )
+
+
+def test_fill_vega_lite_values_with_duplicated_columns():
+    df = pd.DataFrame([[1, 2, "x"], [3, 4, "y"]], columns=["id", "id", "name"])
+    schema = {
+        "mark": "bar",
+        "encoding": {"x": {"field": "name"}, "y": {"field": "id"}},
+    }
+
+    values = fill_vega_lite_values(schema, df)["data"]["values"]
+
+    assert values == [
+        {"id": 2, "name": "x"},
+        {"id": 4, "name": "y"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        [[1, "a", 1.5], [2, None, None]],
+        [[2**63, "a"], [1, "b"]],
+        [[[1, 2], "a"], [[3], "b"]],
+        [[{"k": 1}, "a"], [{"k": 2}, "b"]],
+        [[1, "a"], ["x", "b"]],
+    ],
+)
+def test_to_dataframe_matches_pandas(rows: list[list]):
+    column_names = [f"c{i}" for i in range(len(rows[0]))]
+
+    df = _to_dataframe(rows, column_names)
+    expected = pd.DataFrame(rows, columns=column_names)
+
+    pd.testing.assert_frame_equal(df, expected)
+    # assert_frame_equal treats a numpy array cell as equal to a list
+    assert [type(df[name][0]) for name in column_names] == [
+        type(expected[name][0]) for name in column_names
+    ]
+
+
+@pytest.mark.parametrize("status", ["failed", "stopped"])
+def test_cached_adjust_chart_skips_unfinished_responses(
+    mocker: MockFixture, status: str
+):
+    response = {"status": status, "response": None, "error": {"message": "timeout"}}
+    adjust_chart = mocker.patch("demo.utils.adjust_chart", return_value=response)
+    args = ("q", f"select {status}", {}, AdjustmentOption(chart_type="pie"))
+
+    for _ in range(2):
+        with pytest.raises(_UncachedAdjustChartResponse) as e:
+            _cached_adjust_chart(*args, "English", "duckdb", {})
+        assert e.value.response == response
+
+    assert adjust_chart.call_count == 2
+
+
+def test_cached_adjust_chart_caches_finished_responses(mocker: MockFixture):
+    response = {"status": "finished", "response": {"chart_schema": {}}, "error": None}
+    adjust_chart = mocker.patch("demo.utils.adjust_chart", return_value=response)
+    args = ("q", "select finished", {}, AdjustmentOption(chart_type="pie"))
+
+    for _ in range(2):
+        assert _cached_adjust_chart(*args, "English", "duckdb", {}) == response
+
+    assert adjust_chart.call_count == 1